@@ -0,0 +1,226 @@
+"""Numba-compiled bitboard search used by the Connect Four AI.
+
+Positions are two uint64 bitboards: `position` holds the pieces of the
+player to move and `mask` every occupied cell. Column c uses bits
+c*H1 .. c*H1+ROWS-1 from the bottom up; bit c*H1+ROWS stays empty as a
+sentinel so shifts never wrap from one column into the next.
+"""
+import numpy as np
+from numba import njit
+
+ROWS = 6
+COLS = 7
+H1 = ROWS + 1  # bits per bitboard column, including the sentinel
+
+MATE = np.int64(10**14)
+INF = np.int64(2**62)
+
+# Bitboard masks of every 4-in-a-row window and of the center column
+def build_windows() -> np.ndarray:
+    windows = []
+    for c in range(COLS):
+        for r in range(ROWS):
+            for dc, dr in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                if 0 <= c + 3*dc < COLS and 0 <= r + 3*dr < ROWS:
+                    windows.append(sum(1 << ((c + i*dc) * H1 + r + i*dr) for i in range(4)))
+    return np.array(windows, dtype=np.uint64)
+
+WINDOWS = build_windows()
+CENTER_MASK = np.uint64(((1 << ROWS) - 1) << (COLS//2 * H1))
+
+# Window score indexed by [own pieces][empty cells]; the rest are opponent's
+WINDOW_SCORES = np.zeros((5, 5), dtype=np.int64)
+WINDOW_SCORES[4][0] = 100
+WINDOW_SCORES[3][1] = 5
+WINDOW_SCORES[2][2] = 2
+WINDOW_SCORES[0][1] = -4
+
+# Bits of the top playable row in every column
+TOP_MASK = np.uint64(sum(1 << (c * H1 + ROWS - 1) for c in range(COLS)))
+
+# First bit of every column, and the sentinel bit a full column's height reaches
+BOTTOM_BITS = np.arange(0, COLS * H1, H1, dtype=np.int8)
+TOP_BITS = BOTTOM_BITS + ROWS
+
+# Bit of every (row, col) cell, top row first as the board is drawn
+CELL_BITS = np.array([[c * H1 + ROWS - 1 - r for c in range(COLS)] for r in range(ROWS)],
+                     dtype=np.uint64)
+
+# Transposition table: always-replace entries keyed on position + mask,
+# which is unique per Connect Four position
+TABLE_BITS = 20
+TABLE_ENTRY = np.dtype([('key', 'u8'), ('value', 'i8'), ('depth', 'i1'),
+                        ('flag', 'i1'), ('move', 'i1')])
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Static move ordering: center columns first
+CENTER_ORDER = np.array([3, 4, 2, 5, 1, 6, 0], dtype=np.int64)
+
+# AI replies to the player's first move, keyed on position + mask. Found
+# offline with a depth 8 search; the player always moves first, so these
+# cover the AI's whole first turn.
+OPENING = {
+    0x00000000001: 3,  # player played column 0
+    0x00000000080: 3,  # column 1
+    0x00000004000: 3,  # column 2
+    0x00000200000: 3,  # column 3
+    0x00010000000: 3,  # column 4
+    0x00800000000: 3,  # column 5
+    0x40000000000: 3,  # column 6
+}
+
+
+def new_table() -> np.ndarray:
+    """Create an empty transposition table for negamax."""
+    return np.zeros(1 << TABLE_BITS, dtype=TABLE_ENTRY)
+
+
+def new_killers() -> np.ndarray:
+    """Create an empty killer move table, indexed by pieces on the board."""
+    return np.full(ROWS * COLS + 1, -1, dtype=np.int8)
+
+
+@njit(cache=True)
+def popcount(x: np.uint64) -> np.int64:
+    """Number of set bits in x."""
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return np.int64((x * np.uint64(0x0101010101010101)) >> np.uint64(56))
+
+
+@njit(cache=True)
+def winning_move(pos: np.uint64) -> bool:
+    """Check if the pieces in pos contain four in a row."""
+    # Check horizontal locations
+    m = pos & (pos >> np.uint64(H1))
+    if m & (m >> np.uint64(2 * H1)):
+        return True
+
+    # Check vertical locations
+    m = pos & (pos >> np.uint64(1))
+    if m & (m >> np.uint64(2)):
+        return True
+
+    # Check positively sloped diagonals
+    m = pos & (pos >> np.uint64(H1 + 1))
+    if m & (m >> np.uint64(2 * (H1 + 1))):
+        return True
+
+    # Check negatively sloped diagonals
+    m = pos & (pos >> np.uint64(H1 - 1))
+    if m & (m >> np.uint64(2 * (H1 - 1))):
+        return True
+    return False
+
+
+@njit(cache=True)
+def evaluate_window(pos: np.uint64, empty: np.uint64, window: np.uint64) -> np.int64:
+    """Evaluate a window of 4 cells for the owner of pos."""
+    return WINDOW_SCORES[popcount(pos & window), popcount(empty & window)]
+
+
+@njit(cache=True)
+def score_position(pos: np.uint64, mask: np.uint64) -> np.int64:
+    """Score the board for the owner of pos."""
+    empty = ~mask
+
+    # Score center column
+    score = popcount(pos & CENTER_MASK) * 3
+
+    # Score every horizontal, vertical and diagonal window
+    for i in range(WINDOWS.shape[0]):
+        score += evaluate_window(pos, empty, WINDOWS[i])
+
+    return score
+
+
+@njit(cache=True)
+def table_index(key: np.uint64) -> int:
+    """Slot of key in the transposition table (Fibonacci hashing)."""
+    return int((key * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(64 - TABLE_BITS))
+
+
+@njit(cache=True, nogil=True)
+def negamax(position: np.uint64, mask: np.uint64, heights: np.ndarray, depth: int,
+            alpha: np.int64, beta: np.int64, color: int, table: np.ndarray,
+            killers: np.ndarray) -> tuple:
+    """Negamax with alpha-beta pruning, scored for the player to move.
+
+    color is 1 when the AI is to move and -1 otherwise; the board is always
+    evaluated for the AI and the sign flipped accordingly. heights holds
+    the next free bit of every column and is restored before returning.
+    table and killers come from new_table() and new_killers(). Moves are
+    tried table move first, then the killer move, then center first.
+    Returns (column, score) with column -1 at leaf nodes.
+    """
+    # Only the side that just moved can have won; sooner wins score higher
+    ply = popcount(mask)
+    if winning_move(position ^ mask):
+        return -1, -(MATE - ply)
+    if (mask & TOP_MASK) == TOP_MASK:  # Game is over, no more valid moves
+        return -1, np.int64(0)
+    if depth == 0:
+        ai = position if color > 0 else position ^ mask
+        return -1, color * score_position(ai, mask)
+
+    key = position + mask
+    entry = table[table_index(key)]
+    tt_move = -1
+    if entry['key'] == key:
+        tt_move = entry['move']
+    if entry['key'] == key and entry['depth'] >= depth:
+        if entry['flag'] == EXACT:
+            return np.int64(entry['move']), entry['value']
+        if entry['flag'] == LOWER:
+            alpha = max(alpha, entry['value'])
+        else:
+            beta = min(beta, entry['value'])
+        if alpha >= beta:
+            return np.int64(entry['move']), entry['value']
+    alpha_orig = alpha
+
+    killer = killers[ply]
+
+    column = -1
+    value = -INF
+    # Try the table move, then the killer move, then the rest center first
+    for i in range(COLS + 2):
+        if i == 0:
+            col = tt_move
+        elif i == 1:
+            col = killer
+            if col == tt_move:
+                continue
+        else:
+            col = CENTER_ORDER[i - 2]
+            if col == tt_move or col == killer:
+                continue
+        if col < 0 or heights[col] == TOP_BITS[col]:  # no move or column is full
+            continue
+        move = np.uint64(1) << np.uint64(heights[col])
+        heights[col] += 1
+        new_score = -negamax(position ^ mask, mask | move, heights, depth - 1,
+                             -beta, -alpha, -color, table, killers)[1]
+        heights[col] -= 1
+        if new_score > value:
+            value = new_score
+            column = col
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            killers[ply] = col
+            break
+
+    entry['key'] = key
+    entry['value'] = value
+    entry['depth'] = depth
+    entry['move'] = column
+    if value <= alpha_orig:
+        entry['flag'] = UPPER
+    elif value >= beta:
+        entry['flag'] = LOWER
+    else:
+        entry['flag'] = EXACT
+    return column, value
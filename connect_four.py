@@ -1,11 +1,13 @@
 import pygame
 import numpy as np
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, Optional
 
+import ai_core
+from ai_core import ROWS, COLS
+
 # Constants
-ROWS = 6
-COLS = 7
 SQUARESIZE = 100
 RADIUS = int(SQUARESIZE/2 - 5)
 BLUE = (0, 0, 255)
@@ -31,6 +33,8 @@ class Button:
         self.hover_color = hover_color
         self.is_hovered = False
         self.font = pygame.font.SysFont("Arial", 40, bold=True)
+        self.text_surface = self.font.render(text, True, WHITE)
+        self.text_rect = self.text_surface.get_rect(center=self.rect.center)
 
     def draw(self, screen):
         color = self.hover_color if self.is_hovered else self.color
@@ -44,36 +48,72 @@ class Button:
         pygame.draw.rect(screen, color, self.rect, border_radius=10)
         pygame.draw.rect(screen, WHITE, self.rect, 2, border_radius=10)
         
-        text_surface = self.font.render(self.text, True, WHITE)
-        text_rect = text_surface.get_rect(center=self.rect.center)
-        screen.blit(text_surface, text_rect)
+        screen.blit(self.text_surface, self.text_rect)
 
     def handle_event(self, event):
+        """Returns (clicked, hover_changed) so callers know when to redraw."""
         if event.type == pygame.MOUSEMOTION:
-            self.is_hovered = self.rect.collidepoint(event.pos)
+            was_hovered = self.is_hovered
+            self.is_hovered = bool(self.rect.collidepoint(event.pos))
+            return False, self.is_hovered != was_hovered
         elif event.type == pygame.MOUSEBUTTONDOWN:
             if self.is_hovered:
-                return True
-        return False
+                return True, False
+        return False, False
 
 class ConnectFour:
     def __init__(self):
-        self.board = np.zeros((ROWS, COLS))
+        # Bitboards in the ai_core layout: `position` holds the pieces of the
+        # player to move and `mask` every occupied cell.
+        self.position = 0
+        self.mask = 0
+        self.moves = 0
+        self.heights = ai_core.BOTTOM_BITS.copy()  # next free bit per column
+        self.table = ai_core.new_table()  # transposition table for minimax
+        self.killers = ai_core.new_killers()
+        self._board = None
+        self._board_key = None
         self.game_over = False
         self.turn = 0  # 0 for player, 1 for AI
         self.winner = None  # Add winner tracking
-        
+
+    @property
+    def board(self) -> np.ndarray:
+        """(ROWS, COLS) view of the board for drawing, top row first."""
+        key = (self.position, self.mask)
+        if self._board_key != key:
+            current = self.moves % 2 + 1
+            occupied = (np.uint64(self.mask) >> ai_core.CELL_BITS) & np.uint64(1)
+            own = (np.uint64(self.position) >> ai_core.CELL_BITS) & np.uint64(1)
+            board = np.where(own == 1, current, 3 - current).astype(np.int8)
+            board[occupied == 0] = 0
+            self._board = board
+            self._board_key = key
+        return self._board
+
+    def make_move(self, col: int) -> None:
+        """Play the player to move in col; the caller checks validity."""
+        self.position ^= self.mask
+        self.mask |= 1 << int(self.heights[col])
+        self.heights[col] += 1
+        self.moves += 1
+
+    def get_pieces(self, piece: int) -> int:
+        """Bitboard of the cells occupied by piece (1 or 2)."""
+        if piece == self.moves % 2 + 1:
+            return self.position
+        return self.position ^ self.mask
+
     def drop_piece(self, col: int) -> bool:
         """Drop a piece in the specified column. Returns True if successful."""
         if self.is_valid_location(col):
-            row = self.get_next_open_row(col)
-            self.board[row][col] = self.turn + 1
+            self.make_move(col)
             # Check for win after dropping piece
             if self.winning_move(self.turn + 1):
                 self.game_over = True
                 self.winner = self.turn + 1
             # Check for tie
-            elif len(self.get_valid_locations()) == 0:
+            elif self.is_full():
                 self.game_over = True
                 self.winner = 0  # 0 represents a tie
             return True
@@ -81,169 +121,41 @@ class ConnectFour:
     
     def is_valid_location(self, col: int) -> bool:
         """Check if the column is valid for dropping a piece."""
-        return self.board[0][col] == 0
-    
-    def get_next_open_row(self, col: int) -> int:
-        """Get the next open row in the specified column."""
-        for r in range(ROWS-1, -1, -1):
-            if self.board[r][col] == 0:
-                return r
-        return -1
+        return bool(self.heights[col] < ai_core.TOP_BITS[col])
     
     def winning_move(self, piece: int) -> bool:
         """Check if the last move was a winning move."""
-        # Check horizontal locations
-        for c in range(COLS-3):
-            for r in range(ROWS):
-                if (self.board[r][c] == piece and 
-                    self.board[r][c+1] == piece and 
-                    self.board[r][c+2] == piece and 
-                    self.board[r][c+3] == piece):
-                    return True
-
-        # Check vertical locations
-        for c in range(COLS):
-            for r in range(ROWS-3):
-                if (self.board[r][c] == piece and 
-                    self.board[r+1][c] == piece and 
-                    self.board[r+2][c] == piece and 
-                    self.board[r+3][c] == piece):
-                    return True
-
-        # Check positively sloped diagonals
-        for c in range(COLS-3):
-            for r in range(ROWS-3):
-                if (self.board[r][c] == piece and 
-                    self.board[r+1][c+1] == piece and 
-                    self.board[r+2][c+2] == piece and 
-                    self.board[r+3][c+3] == piece):
-                    return True
-
-        # Check negatively sloped diagonals
-        for c in range(COLS-3):
-            for r in range(3, ROWS):
-                if (self.board[r][c] == piece and 
-                    self.board[r-1][c+1] == piece and 
-                    self.board[r-2][c+2] == piece and 
-                    self.board[r-3][c+3] == piece):
-                    return True
-        return False
+        return ai_core.winning_move(np.uint64(self.get_pieces(piece)))
 
-    def evaluate_window(self, window: np.ndarray, piece: int) -> int:
-        """Evaluate a window of 4 pieces."""
-        score = 0
-        opp_piece = 2 if piece == 1 else 1
-
-        if window.count(piece) == 4:
-            score += 100
-        elif window.count(piece) == 3 and window.count(0) == 1:
-            score += 5
-        elif window.count(piece) == 2 and window.count(0) == 2:
-            score += 2
-
-        if window.count(opp_piece) == 3 and window.count(0) == 1:
-            score -= 4
-
-        return score
-
-    def score_position(self, piece: int) -> int:
-        """Score the current board position."""
-        score = 0
-
-        # Score center column
-        center_array = [int(i) for i in list(self.board[:, COLS//2])]
-        center_count = center_array.count(piece)
-        score += center_count * 3
-
-        # Score horizontal
-        for r in range(ROWS):
-            row_array = [int(i) for i in list(self.board[r,:])]
-            for c in range(COLS-3):
-                window = row_array[c:c+4]
-                score += self.evaluate_window(window, piece)
-
-        # Score vertical
-        for c in range(COLS):
-            col_array = [int(i) for i in list(self.board[:,c])]
-            for r in range(ROWS-3):
-                window = col_array[r:r+4]
-                score += self.evaluate_window(window, piece)
-
-        # Score positive sloped diagonal
-        for r in range(ROWS-3):
-            for c in range(COLS-3):
-                window = [self.board[r+i][c+i] for i in range(4)]
-                score += self.evaluate_window(window, piece)
-
-        # Score negative sloped diagonal
-        for r in range(ROWS-3):
-            for c in range(COLS-3):
-                window = [self.board[r+3-i][c+i] for i in range(4)]
-                score += self.evaluate_window(window, piece)
-
-        return score
-
-    def is_terminal_node(self) -> bool:
-        """Check if the current board state is a terminal node."""
-        return (self.winning_move(1) or 
-                self.winning_move(2) or 
-                len(self.get_valid_locations()) == 0)
-
-    def get_valid_locations(self) -> list:
-        """Get list of valid column locations."""
-        valid_locations = []
-        for col in range(COLS):
-            if self.is_valid_location(col):
-                valid_locations.append(col)
-        return valid_locations
+    def is_full(self) -> bool:
+        """Check if every column is full."""
+        return bool((self.heights == ai_core.TOP_BITS).all())
 
     def minimax(self, depth: int, alpha: float, beta: float, maximizing_player: bool) -> Tuple[Optional[int], int]:
         """Minimax algorithm with alpha-beta pruning."""
-        valid_locations = self.get_valid_locations()
-        is_terminal = self.is_terminal_node()
-        
-        if depth == 0 or is_terminal:
-            if is_terminal:
-                if self.winning_move(2):  # AI wins
-                    return (None, 100000000000000)
-                elif self.winning_move(1):  # Player wins
-                    return (None, -10000000000000)
-                else:  # Game is over, no more valid moves
-                    return (None, 0)
-            else:  # Depth is zero
-                return (None, self.score_position(2))
-
-        if maximizing_player:
-            value = float('-inf')
-            column = valid_locations[0]
-            for col in valid_locations:
-                row = self.get_next_open_row(col)
-                self.board[row][col] = 2
-                new_score = self.minimax(depth-1, alpha, beta, False)[1]
-                self.board[row][col] = 0
-                if new_score > value:
-                    value = new_score
-                    column = col
-                alpha = max(alpha, value)
-                if alpha >= beta:
-                    break
-            return column, value
-
-        else:  # Minimizing player
-            value = float('inf')
-            column = valid_locations[0]
-            for col in valid_locations:
-                row = self.get_next_open_row(col)
-                self.board[row][col] = 1
-                new_score = self.minimax(depth-1, alpha, beta, True)[1]
-                self.board[row][col] = 0
-                if new_score < value:
-                    value = new_score
-                    column = col
-                beta = min(beta, value)
-                if alpha >= beta:
-                    break
-            return column, value
+        alpha = int(max(alpha, -ai_core.INF))
+        beta = int(min(beta, ai_core.INF))
+        # negamax scores for the player to move, so flip the window and the
+        # result when that is the minimizing player
+        if not maximizing_player:
+            alpha, beta = -beta, -alpha
+        color = 1 if maximizing_player else -1
+        # Search on a copy of heights: the UI may read them while a search runs
+        column, value = ai_core.negamax(np.uint64(self.position), np.uint64(self.mask),
+                                        self.heights.copy(), depth, alpha, beta, color,
+                                        self.table, self.killers)
+        return (None if column < 0 else int(column)), color * int(value)
+
+    def search(self, max_depth: int) -> Tuple[Optional[int], int]:
+        """Iterative deepening minimax for the AI, returning (column, score).
+
+        Each iteration leaves its best moves in the transposition table, so
+        the next, deeper one searches them first.
+        """
+        column, value = None, 0
+        for depth in range(1, max_depth + 1):
+            column, value = self.minimax(depth, float('-inf'), float('inf'), True)
+        return column, value
 
 class Game:
     def __init__(self):
@@ -255,8 +167,33 @@ class Game:
         pygame.display.set_caption("Connect Four")
         self.font = pygame.font.SysFont("Arial", 75, bold=True)
         self.small_font = pygame.font.SysFont("Arial", 40, bold=True)
+
+        # Render the title and game over texts once, with their shadows
+        self.title = self.font.render("Connect Four", True, WHITE)
+        self.title_shadow = self.font.render("Connect Four", True, BLACK)
+        self.game_over_texts = {}
+        for winner, text, color in ((1, "You Win!", RED),
+                                    (2, "AI Wins!", YELLOW),
+                                    (0, "It's a Tie!", WHITE)):
+            self.game_over_texts[winner] = (self.font.render(text, True, color),
+                                            self.font.render(text, True, BLACK))
+        self.overlay = pygame.Surface((self.width, self.height))
+        self.overlay.set_alpha(180)
+        self.overlay.fill(BLACK)
+
+        # Pre-render the empty board and the two pieces
+        self.board_background = self.build_board_background()
+        self.pieces = {1: self.build_piece(RED, (200, 0, 0)),
+                       2: self.build_piece(YELLOW, (200, 200, 0))}
         self.game = ConnectFour()
         self.state = MENU
+        self.clock = pygame.time.Clock()
+        self.menu_drawn = False
+        self.ai_pool = ThreadPoolExecutor(max_workers=1)
+        self.ai_future = None
+
+        # Compile the AI search now so the first move isn't delayed by the JIT
+        self.game.search(1)
         
         # Create buttons
         button_width = 200
@@ -275,12 +212,10 @@ class Game:
         self.screen.fill(BACKGROUND_COLOR)
         
         # Draw title with shadow
-        title = self.font.render("Connect Four", True, BLACK)
-        title_shadow = self.font.render("Connect Four", True, WHITE)
-        title_rect = title.get_rect(center=(self.width//2 + 4, 104))
-        title_shadow_rect = title_shadow.get_rect(center=(self.width//2, 100))
-        self.screen.blit(title, title_rect)
-        self.screen.blit(title_shadow, title_shadow_rect)
+        title_shadow_rect = self.title_shadow.get_rect(center=(self.width//2 + 4, 104))
+        title_rect = self.title.get_rect(center=(self.width//2, 100))
+        self.screen.blit(self.title_shadow, title_shadow_rect)
+        self.screen.blit(self.title, title_rect)
         
         # Draw decorative circles
         for i in range(3):
@@ -291,25 +226,11 @@ class Game:
         pygame.display.update()
 
     def draw_game_over(self, winner):
-        # Create semi-transparent overlay
-        overlay = pygame.Surface((self.width, self.height))
-        overlay.set_alpha(180)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
-        
-        if winner == 1:
-            text = "You Win!"
-            color = RED
-        elif winner == 2:
-            text = "AI Wins!"
-            color = YELLOW
-        else:
-            text = "It's a Tie!"
-            color = WHITE
-            
+        # Draw semi-transparent overlay
+        self.screen.blit(self.overlay, (0, 0))
+
         # Draw text with shadow
-        game_over_shadow = self.font.render(text, True, BLACK)
-        game_over_text = self.font.render(text, True, color)
+        game_over_text, game_over_shadow = self.game_over_texts[winner]
         shadow_rect = game_over_shadow.get_rect(center=(self.width//2 + 4, 204))
         text_rect = game_over_text.get_rect(center=(self.width//2, 200))
         self.screen.blit(game_over_shadow, shadow_rect)
@@ -318,13 +239,14 @@ class Game:
         self.restart_button.draw(self.screen)
         pygame.display.update()
 
-    def draw_board(self):
-        """Draw the game board."""
-        self.screen.fill(BACKGROUND_COLOR)
+    def build_board_background(self) -> pygame.Surface:
+        """Render the empty board once; draw_board blits pieces over it."""
+        background = pygame.Surface(self.size).convert()
+        background.fill(BACKGROUND_COLOR)
         
         # Draw board background
         board_rect = pygame.Rect(0, SQUARESIZE, self.width, ROWS * SQUARESIZE)
-        pygame.draw.rect(self.screen, BOARD_COLOR, board_rect)
+        pygame.draw.rect(background, BOARD_COLOR, board_rect)
         
         # Draw holes
         for c in range(COLS):
@@ -332,28 +254,33 @@ class Game:
                 center = (int(c*SQUARESIZE + SQUARESIZE/2), 
                          int((r+1)*SQUARESIZE + SQUARESIZE/2))
                 # Draw hole shadow
-                pygame.draw.circle(self.screen, (0, 0, 0, 128), 
+                pygame.draw.circle(background, (0, 0, 0, 128), 
                                  (center[0] + 2, center[1] + 2), RADIUS)
                 # Draw hole
-                pygame.draw.circle(self.screen, BLACK, center, RADIUS)
+                pygame.draw.circle(background, BLACK, center, RADIUS)
+        return background
+
+    def build_piece(self, color, shadow_color) -> pygame.Surface:
+        """Render a piece with its shadow, to be blitted at center - RADIUS."""
+        piece = pygame.Surface((2*RADIUS + 3, 2*RADIUS + 3), pygame.SRCALPHA)
+        # Draw piece shadow
+        pygame.draw.circle(piece, shadow_color, (RADIUS + 2, RADIUS + 2), RADIUS)
+        # Draw piece
+        pygame.draw.circle(piece, color, (RADIUS, RADIUS), RADIUS)
+        return piece
+
+    def draw_board(self):
+        """Draw the game board."""
+        self.screen.blit(self.board_background, (0, 0))
 
         # Draw pieces
+        board = self.game.board
         for c in range(COLS):
             for r in range(ROWS):
-                center = (int(c*SQUARESIZE + SQUARESIZE/2), 
-                         int((r+1)*SQUARESIZE + SQUARESIZE/2))
-                if self.game.board[r][c] == 1:
-                    # Draw piece shadow
-                    pygame.draw.circle(self.screen, (200, 0, 0), 
-                                     (center[0] + 2, center[1] + 2), RADIUS)
-                    # Draw piece
-                    pygame.draw.circle(self.screen, RED, center, RADIUS)
-                elif self.game.board[r][c] == 2:
-                    # Draw piece shadow
-                    pygame.draw.circle(self.screen, (200, 200, 0), 
-                                     (center[0] + 2, center[1] + 2), RADIUS)
-                    # Draw piece
-                    pygame.draw.circle(self.screen, YELLOW, center, RADIUS)
+                if board[r][c] in self.pieces:
+                    self.screen.blit(self.pieces[board[r][c]],
+                                     (c*SQUARESIZE + SQUARESIZE//2 - RADIUS,
+                                      (r+1)*SQUARESIZE + SQUARESIZE//2 - RADIUS))
         
         pygame.display.update()
 
@@ -361,35 +288,37 @@ class Game:
         """Main game loop."""
         while True:
             if self.state == MENU:
-                self.draw_menu()
+                if not self.menu_drawn:
+                    self.draw_menu()
+                    self.menu_drawn = True
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         pygame.quit()
                         sys.exit()
                     
-                    if self.play_button.handle_event(event):
+                    clicked, hover_changed = self.play_button.handle_event(event)
+                    if clicked:
                         self.state = PLAYING
                         self.game = ConnectFour()
                         self.draw_board()
+                    elif hover_changed:
+                        self.menu_drawn = False
                         
             elif self.state == PLAYING:
+                # Only the latest mouse position matters for the hover piece
+                motions = pygame.event.get(pygame.MOUSEMOTION)
+                if motions and self.game.turn == 0 and not self.game.game_over:
+                    top_rect = pygame.Rect(0, 0, self.width, SQUARESIZE)
+                    pygame.draw.rect(self.screen, BACKGROUND_COLOR, top_rect)
+                    posx = motions[-1].pos[0]
+                    self.screen.blit(self.pieces[1], (posx - RADIUS, SQUARESIZE//2 - RADIUS))
+                    pygame.display.update(top_rect)
+
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         pygame.quit()
                         sys.exit()
 
-                    if event.type == pygame.MOUSEMOTION and self.game.turn == 0 and not self.game.game_over:
-                        pygame.draw.rect(self.screen, BACKGROUND_COLOR, 
-                                       (0, 0, self.width, SQUARESIZE))
-                        posx = event.pos[0]
-                        # Draw piece shadow
-                        pygame.draw.circle(self.screen, (200, 0, 0), 
-                                         (posx + 2, int(SQUARESIZE/2) + 2), RADIUS)
-                        # Draw piece
-                        pygame.draw.circle(self.screen, RED, 
-                                         (posx, int(SQUARESIZE/2)), RADIUS)
-                        pygame.display.update()
-
                     if event.type == pygame.MOUSEBUTTONDOWN and self.game.turn == 0 and not self.game.game_over:
                         pygame.draw.rect(self.screen, BACKGROUND_COLOR, 
                                        (0, 0, self.width, SQUARESIZE))
@@ -406,8 +335,17 @@ class Game:
                                     self.game.turn = 1
 
                 if self.game.turn == 1 and not self.game.game_over:
-                    col, minimax_score = self.game.minimax(4, float('-inf'), float('inf'), True)
-                    if self.game.is_valid_location(col):
+                    col = None
+                    key = self.game.position + self.game.mask
+                    if key in ai_core.OPENING:
+                        col = ai_core.OPENING[key]
+                    elif self.ai_future is None:
+                        # Search in the background so the window keeps responding
+                        self.ai_future = self.ai_pool.submit(self.game.search, 4)
+                    elif self.ai_future.done():
+                        col, minimax_score = self.ai_future.result()
+                        self.ai_future = None
+                    if col is not None and self.game.is_valid_location(col):
                         if self.game.drop_piece(col):
                             self.draw_board()
                             if self.game.game_over:
@@ -422,10 +360,17 @@ class Game:
                         pygame.quit()
                         sys.exit()
                         
-                    if self.restart_button.handle_event(event):
+                    clicked, hover_changed = self.restart_button.handle_event(event)
+                    if clicked:
                         self.state = PLAYING
                         self.game = ConnectFour()
                         self.draw_board()
+                    elif hover_changed:
+                        # Redraw just the button; the overlay must not stack up
+                        self.restart_button.draw(self.screen)
+                        pygame.display.update(self.restart_button.rect)
+
+            self.clock.tick(60)
 
 if __name__ == "__main__":
     game = Game()